@@ -4,12 +4,20 @@
 
 import inspect
 from abc import abstractmethod
+from importlib import import_module
 from typing import Any, Self
 
 import numpy as np
 import numpy.typing as npt
-from sage.all import var
-from sklearn.utils import check_array
+
+
+def init_default(name: str) -> object:
+    """Create the symbolic variable of a parameter without a value.
+
+    Sage is imported on the first call, i.e. only when a default symbolic
+    parameter is needed.
+    """
+    return import_module('sage.all').var(name)
 
 
 class BaseSystemComponent:
@@ -20,6 +28,8 @@ class BaseSystemComponent:
             The label of the component.
     """
 
+    _params_names: tuple[tuple[str, ...], tuple[str, ...]] = (('label',), ())
+
     def __init__(self: Self, label: str) -> None:
         """Initialize the system component with a label."""
         self.label = label
@@ -29,21 +39,23 @@ class BaseSystemComponent:
     def _init_param(self: Self, param_name: str) -> Self:
         return self
 
+    def __init_subclass__(cls: type[Self], **kwargs: object) -> None:
+        """Split the names of the constructor parameters of the subclass to label and value names."""
+        super().__init_subclass__(**kwargs)
+        names = tuple(inspect.signature(cls.__init__).parameters)[1:]
+        labels_names = tuple(name for name in names if name == 'label' or name.endswith('_label'))
+        values_names = tuple(name for name in names if name not in labels_names)
+        cls._params_names = (labels_names, values_names)
+
     def _init(self: Self) -> Self:
         """Initialize the component's properties."""
-        parameters = inspect.signature(self.__init__).parameters.values()  # type: ignore[misc]
-        labels = [
-            getattr(self, parameter.name)
-            for parameter in parameters
-            if parameter.name == 'label' or parameter.name.endswith('_label')
-        ]
-        for parameter in parameters:
-            if parameter.name != 'label' and not parameter.name.endswith('_label'):
-                value = getattr(self, parameter.name)
-                if value is None:
-                    setattr(self, f'{parameter.name}_', var(f'{parameter.name}__{"__".join(labels)}'))
-                else:
-                    self._init_param(parameter.name)
+        labels_names, values_names = self._params_names
+        labels = '__'.join(getattr(self, name) for name in labels_names)
+        for name in values_names:
+            if getattr(self, name) is None:
+                setattr(self, f'{name}_', init_default(f'{name}__{labels}'))
+            else:
+                self._init_param(name)
         return self
 
 
@@ -127,112 +139,106 @@ class BaseSystem:
         self: Self,
         element: BaseElement,
     ) -> list[BaseElementsInteraction | BaseEnvironmentInteraction]:
-        label = element.label
-        interactions: list[BaseElementsInteraction | BaseEnvironmentInteraction] = []
-        for interaction in self.elements_interactions_:
-            if label == interaction.element_1_label and isinstance(interaction, BaseElementsInteraction):
-                interactions.append(interaction)
-        for interaction in self.environment_interactions_:
-            if label == interaction.element_label and isinstance(interaction, BaseEnvironmentInteraction):
-                interactions.append(interaction)
-        return interactions
+        return self.interactions_index_.get(element.label, [])
 
     def _check_elements(self: Self) -> Self:
         """Check elements."""
-        self.elements_: npt.NDArray[np.object_]
+        self.elements_: list[BaseElement]
         self.elements_labels_: npt.NDArray[np.str_]
+        self._elements_labels_set: frozenset[str]
         if self.elements is None:
-            self.elements_ = np.array([], dtype=object)
+            self.elements_ = []
             self.elements_labels_ = np.array([], dtype=str)
+            self._elements_labels_set = frozenset()
             return self
-        if not isinstance(self.elements, list) or not all(
-            isinstance(element, BaseElement) for element in self.elements
-        ):
-            error_msg = 'Parameter `elements` should be an list of `Element` objects.'
+        error_msg = 'Parameter `elements` should be an list of `Element` objects.'
+        if not isinstance(self.elements, list):
             raise TypeError(error_msg)
-        elements_labels = check_array([element.label for element in self.elements], ensure_2d=False, dtype=str)
-        assert np.unique(elements_labels).size == elements_labels.size, 'Elements should have unique labels.'
-        self.elements_ = check_array(self.elements, ensure_2d=False, dtype=object)
-        self.elements_labels_ = check_array(elements_labels, ensure_2d=False, dtype=str)
+        elements_labels: list[str] = []
+        for element in self.elements:
+            if not isinstance(element, BaseElement):
+                raise TypeError(error_msg)
+            elements_labels.append(element.label)
+        assert len(set(elements_labels)) == len(elements_labels), 'Elements should have unique labels.'
+        self.elements_ = list(self.elements)
+        self.elements_labels_ = np.asarray(elements_labels, dtype=str)
+        self._elements_labels_set = frozenset(elements_labels)
         return self
 
     def _check_elements_interactions(self: Self) -> Self:
-        self.elements_interactions_: npt.NDArray[np.object_]
+        self.elements_interactions_: list[BaseElementsInteraction]
         self.elements_interactions_labels_: npt.NDArray[np.str_]
         if self.elements_interactions is None:
-            self.elements_interactions_ = np.array([], dtype=object)
+            self.elements_interactions_ = []
             self.elements_interactions_labels_ = np.array([], dtype=str)
             return self
-        if not isinstance(self.elements_interactions, list) or not all(
-            isinstance(interaction, BaseElementsInteraction) for interaction in self.elements_interactions
-        ):
-            error_msg = 'Parameter `elements_interactions` should be an list of `ElementsInteraction` object.'
+        error_msg = 'Parameter `elements_interactions` should be an list of `ElementsInteraction` object.'
+        if not isinstance(self.elements_interactions, list):
             raise TypeError(error_msg)
+        elements_interactions_labels: list[tuple[str, str, str]] = []
         for interaction in self.elements_interactions:
-            if interaction.element_1_label not in self.elements_labels_:
+            if not isinstance(interaction, BaseElementsInteraction):
+                raise TypeError(error_msg)
+            elements_interactions_labels.append(
+                (interaction.label, interaction.element_1_label, interaction.element_2_label),
+            )
+        for _, element_1_label, element_2_label in elements_interactions_labels:
+            if element_1_label not in self._elements_labels_set:
                 error_msg = (
                     'Element label 1 should be one of the available elements '
-                    f'labels. Got {interaction.element_1_label} instead.'
+                    f'labels. Got {element_1_label} instead.'
                 )
                 raise ValueError(error_msg)
-            if interaction.element_2_label not in self.elements_labels_:
+            if element_2_label not in self._elements_labels_set:
                 error_msg = (
                     'Element label 2 should be one of the available elements labels. '
-                    f'Got {interaction.element_2_label} instead.'
+                    f'Got {element_2_label} instead.'
                 )
                 raise ValueError(error_msg)
-            if interaction.element_1_label == interaction.element_2_label:
+            if element_1_label == element_2_label:
                 error_msg = (
                     'Element labels 1 and 2 should be different. '
-                    f'Got {interaction.element_1_label} and {interaction.element_2_label} instead.'
+                    f'Got {element_1_label} and {element_2_label} instead.'
                 )
                 raise ValueError(error_msg)
-        elements_interactions_labels = check_array(
-            [
-                (interaction.label, interaction.element_1_label, interaction.element_2_label)
-                for interaction in self.elements_interactions
-            ],
-            ensure_2d=False,
-            dtype=str,
-        )
         error_msg = (
             'Interactions between elements should '
             'have unique labels of the form (label, element_1_label, element_2_label).'
         )
-        assert np.unique(elements_interactions_labels, axis=0).size == elements_interactions_labels.size, error_msg
-        self.elements_interactions_ = check_array(self.elements_interactions, ensure_2d=False, dtype=object)
-        self.elements_interactions_labels_ = check_array(elements_interactions_labels, dtype=str)
+        assert len(set(elements_interactions_labels)) == len(elements_interactions_labels), error_msg
+        self.elements_interactions_ = list(self.elements_interactions)
+        self.elements_interactions_labels_ = np.asarray(elements_interactions_labels, dtype=str)
         return self
 
     def _check_environment_interactions(self: Self) -> Self:
-        self.environment_interactions_: npt.NDArray[np.object_]
+        self.environment_interactions_: list[BaseEnvironmentInteraction]
         self.environment_interactions_labels_: npt.NDArray[np.str_]
         if self.environment_interactions is None:
-            self.environment_interactions_ = np.array([], dtype=object)
+            self.environment_interactions_ = []
             self.environment_interactions_labels_ = np.array([], dtype=str)
             return self
-        if not isinstance(self.environment_interactions, list) or not all(
-            isinstance(interaction, BaseEnvironmentInteraction) for interaction in self.environment_interactions
-        ):
-            error_msg = 'Parameter `environment_interactions` should be an list of `EnvironmentInteraction` object.'
+        error_msg = 'Parameter `environment_interactions` should be an list of `EnvironmentInteraction` object.'
+        if not isinstance(self.environment_interactions, list):
             raise TypeError(error_msg)
+        environment_interactions_labels: list[tuple[str, str]] = []
         for interaction in self.environment_interactions:
-            if interaction.element_label not in self.elements_labels_:
+            if not isinstance(interaction, BaseEnvironmentInteraction):
+                raise TypeError(error_msg)
+            environment_interactions_labels.append((interaction.label, interaction.element_label))
+        for _, element_label in environment_interactions_labels:
+            if element_label not in self._elements_labels_set:
                 error_msg = (
                     'Element label should be one of the available elements labels. '
-                    f'Got {interaction.element_label} instead.'
+                    f'Got {element_label} instead.'
                 )
                 raise ValueError(error_msg)
-        environment_interactions_labels = check_array(
-            [(interaction.label, interaction.element_label) for interaction in self.environment_interactions],
-            ensure_2d=False,
-            dtype=str,
+        error_msg = (
+            'Interactions of elements with environment should '
+            'have unique labels of the form (label, element_label).'
         )
-        assert (
-            np.unique(environment_interactions_labels, axis=0).size == environment_interactions_labels.size
-        ), 'Interactions of elements with environment should have unique labels of the form (label, element_label).'
-        self.environment_interactions_ = check_array(self.environment_interactions, ensure_2d=False, dtype=object)
-        self.environment_interactions_labels_ = check_array(environment_interactions_labels, dtype=str)
+        assert len(set(environment_interactions_labels)) == len(environment_interactions_labels), error_msg
+        self.environment_interactions_ = list(self.environment_interactions)
+        self.environment_interactions_labels_ = np.asarray(environment_interactions_labels, dtype=str)
         return self
 
     def _check_space(self: Self) -> Self:
@@ -243,12 +249,24 @@ class BaseSystem:
             self.space_ = self.space
         return self
 
+    def _set_interactions_index(self: Self) -> Self:
+        """Group the interactions by the label of the element they act on."""
+        self.interactions_index_: dict[str, list[BaseElementsInteraction | BaseEnvironmentInteraction]] = {
+            element.label: [] for element in self.elements_
+        }
+        for elements_interaction in self.elements_interactions_:
+            self.interactions_index_[elements_interaction.element_1_label].append(elements_interaction)
+        for environment_interaction in self.environment_interactions_:
+            self.interactions_index_[environment_interaction.element_label].append(environment_interaction)
+        return self
+
     def simulate(self: Self) -> Self:
         """Simulate the complex systems."""
         self._check_elements()
         self._check_elements_interactions()
         self._check_environment_interactions()
         self._check_space()
+        self._set_interactions_index()
         self.simulation_results_: dict[str, Any] = {}
         return self
 
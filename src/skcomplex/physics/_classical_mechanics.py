@@ -7,14 +7,32 @@ dynamical equations of Netwonian systems.
 # Author: Georgios Douzas <gdouzas@icloud.com> License: MIT
 
 from collections.abc import Iterable
+from functools import cache, lru_cache
 from typing import Any, Self, cast
 
-from sage.all import Expression, assume, desolve, diff, function, symbolic_expression, var, vector, zero_vector
+import numpy as np
+from sage.all import Expression, assume, assumptions, desolve, diff, forget, function, symbolic_expression, var
 from sklearn.utils import check_scalar
+from sklearn.utils.parallel import Parallel, delayed
 
 from ..base import BaseElement, BaseElementsInteraction, BaseEnvironmentInteraction, BaseSystem
 from ..spaces import EuclideanSpace
 
+TIME = var('t')
+INTEGRATION_CONSTANTS = var('_K1 _K2')
+
+
+@lru_cache(maxsize=1024)
+def init_numeric(value: float | int) -> Expression:
+    """Convert a numeric value to a symbolic expression, reusing recent conversions."""
+    return symbolic_expression(float(value))
+
+
+@cache
+def coordinate_function(coord: str) -> Expression:
+    """Get the symbolic function of time of the provided coordinate."""
+    return function(coord)(TIME)
+
 
 def init_force(F: list[Expression | float | int]) -> list[Expression]:
     """Check the provided force vector."""
@@ -25,10 +43,8 @@ def init_force(F: list[Expression | float | int]) -> list[Expression]:
     except TypeError as error:
         raise TypeError(error_msg) from error
     F_norm = [
-        symbolic_expression(
-            float(F_func_component) if isinstance(F_func_component, float | int) else F_func_component,
-        )
-        for F_func_component in F
+        init_numeric(F_component) if isinstance(F_component, float | int) else symbolic_expression(F_component)
+        for F_component in F
     ]
     return F_norm
 
@@ -41,6 +57,49 @@ def init_potential(V: Expression | float | int) -> symbolic_expression:
     return symbolic_expression(V)
 
 
+def has_inexact_numbers(expression: Expression) -> bool:
+    """Check whether the expression contains floating point numbers."""
+    if expression.is_numeric():
+        value = expression.pyobject()
+        return isinstance(value, float | complex) or not value.parent().is_exact()
+    return any(has_inexact_numbers(operand) for operand in expression.operands())
+
+
+def solve_constant_acceleration(a: Expression) -> Expression:
+    """Solve analytically the equation of motion under a constant acceleration.
+
+    The integration constants are named `_K1` and `_K2`, as in `desolve`. The
+    acceleration should not contain floating point numbers, since `desolve`
+    converts them to rationals.
+    """
+    K1, K2 = INTEGRATION_CONSTANTS
+    return a * TIME**2 / 2 + K2 * TIME + K1
+
+
+def solve_dynamic_equation(
+    de: Expression,
+    coord: str,
+    ics: list[Any] | None = None,
+    declared_assumptions: list[Any] | None = None,
+) -> Expression:
+    """Solve a dynamic equation for the provided coordinate.
+
+    The declared assumptions are registered before solving, since worker
+    processes do not share the assumptions of the parent process.
+    """
+    t = TIME
+    current_assumptions = {str(assumption) for assumption in assumptions()}
+    new_assumptions = [
+        assumption for assumption in (declared_assumptions or []) if str(assumption) not in current_assumptions
+    ]
+    assume(*new_assumptions)
+    try:
+        return desolve(de, dvar=coordinate_function(coord), ivar=t, ics=ics)
+    finally:
+        if new_assumptions:
+            forget(*new_assumptions)
+
+
 class PointParticle(BaseElement):
 
     def __init__(self: Self, label: str, m: int | float | None = None) -> None:
@@ -135,6 +194,14 @@ class ClassicalMechanicsSystem(BaseSystem):
 
         n_dim:
             Number of spatial dimensions.
+
+        n_jobs:
+            Number of jobs to run in parallel when solving the dynamic equations.
+            `None` means 1 and `-1` means using all processors. Every worker
+            process imports Sage on startup and each equation is pickled to
+            and from the workers, while `desolve` takes only milliseconds per
+            equation, so values larger than 1 are usually slower than solving
+            serially.
     """
 
     def __init__(
@@ -143,7 +210,9 @@ class ClassicalMechanicsSystem(BaseSystem):
         internal_interactions: Iterable[InternalForce | InternalPotential] | None = None,
         external_interactions: Iterable[ExternalForce | ExternalPotential] | None = None,
         space: EuclideanSpace | None = None,
+        n_jobs: int | None = None,
     ) -> None:
+        self.n_jobs = n_jobs
         super().__init__(
             elements=particles,
             elements_interactions=internal_interactions,
@@ -151,35 +220,87 @@ class ClassicalMechanicsSystem(BaseSystem):
             space=space,
         )
 
+    def _get_total_force(self: Self, element: BaseElement) -> list[Expression]:
+        """Sum the forces that act on the element."""
+        interactions = self._get_element_interactions(element)
+        for interaction in interactions:
+            if not isinstance(interaction.F_, list) or len(interaction.F_) != self.space_.n_dim_:
+                error_msg = (
+                    f'Force `{interaction.label}` acting on element `{element.label}` should have '
+                    f'{self.space_.n_dim_} components. Got `{interaction.F_}` instead.'
+                )
+                raise ValueError(error_msg)
+        F_vects = [interaction.F for interaction in interactions]
+
+        # Numeric forces, summed as floats
+        if F_vects and all(
+            isinstance(F_vect, list) and all(isinstance(F_component, float | int) for F_component in F_vect)
+            for F_vect in F_vects
+        ):
+            return [init_numeric(F_component) for F_component in np.array(F_vects, dtype=float).sum(axis=0)]
+
+        # Symbolic forces
+        F = [symbolic_expression(0)] * self.space_.n_dim_
+        for interaction in interactions:
+            F = [
+                F_component + F_interaction_component
+                for F_component, F_interaction_component in zip(F, interaction.F_, strict=True)
+            ]
+        return F
+
+    def _set_coordinates_names(self: Self) -> Self:
+        """Set the names of the coordinates and velocities of each element."""
+        space_coords = list(self.space_.coordinates_[:])
+        self.coordinates_names_: dict[str, list[str]] = {}
+        self.velocities_names_: dict[str, list[str]] = {}
+        for element in self.elements_:
+            label = element.label
+            self.coordinates_names_[label] = [f'{coord}__{label}' for coord in space_coords]
+            self.velocities_names_[label] = [f'v_{coord}__{label}' for coord in space_coords]
+        return self
+
     def _set_dynamic_equations(self: Self) -> Self:
-        t = var('t')
+        t = TIME
         for element in self.elements_:
             label = element.label
-            F = zero_vector(self.space_.n_dim_)
-            for interaction in self._get_element_interactions(element):
-                F += vector(interaction.F_)
-            coords = [f'{coord}__{label}' for coord in self.space_.coordinates_[:]]
-            velocities = [f'v_{coord}__{label}' for coord in self.space_.coordinates_[:]]
-            self.simulation_results_['dynamic_equations']['formulas'][label] = []
-            for ind, F_component in enumerate(F):
+            F = self._get_total_force(element)
+            coords = self.coordinates_names_[label]
+            velocities = self.velocities_names_[label]
+            subs = {symbol: coordinate_function(symbol) for symbol in (coords + velocities)}
+            if isinstance(element.m_, Expression):
                 assume(element.m_ > 0)
-                self.simulation_results_['dynamic_equations']['formulas'][label].append(
-                    element.m_ * diff(function(coords[ind])(t), t, 2)
-                    == symbolic_expression(F_component)(
-                        **{symbol: function(symbol)(t) for symbol in (coords + velocities)},
-                    ),
-                )
+            formulas = self.simulation_results_['dynamic_equations']['formulas'][label] = [None] * len(F)
+            for ind, F_component in enumerate(F):
+                rhs = F_component if F_component.is_trivial_zero() else F_component(**subs)
+                formulas[ind] = element.m_ * diff(subs[coords[ind]], t, 2) == rhs
         return self
 
     def _solve_dynamic_equations(self: Self, I: dict[str, Any] | None = None) -> Self:
-        t = var('t')
+        t = TIME
+        masses = {element.label: element.m_ for element in self.elements_}
+        solutions = self.simulation_results_['dynamic_equations']['solutions']
+        tasks = []
         for label, des in self.simulation_results_['dynamic_equations']['formulas'].items():
-            coords = [f'{coord}__{label}' for coord in self.space_.coordinates_[:]]
-            self.simulation_results_['dynamic_equations']['solutions'][label] = []
+            coords = self.coordinates_names_[label]
+            solutions[label] = [None] * len(des)
             for ind, de in enumerate(des):
-                self.simulation_results_['dynamic_equations']['solutions'][label].append(
-                    desolve(de, dvar=function(coords[ind])(t), ivar=t, ics=I[label][ind] if I is not None else None),
-                )
+                ics = I[label][ind] if I is not None else None
+
+                # Constant exact force without initial conditions, solved without calling Maxima
+                rhs = de.rhs()
+                a = symbolic_expression(0) if rhs.is_trivial_zero() else rhs / masses[label]
+                if ics is None and not rhs.has(t) and not has_inexact_numbers(a):
+                    solutions[label][ind] = solve_constant_acceleration(a)
+                else:
+                    tasks.append((label, ind, de, coords[ind], ics))
+
+        # Remaining equations, solved in parallel
+        declared_assumptions = assumptions()
+        tasks_solutions = Parallel(n_jobs=self.n_jobs)(
+            delayed(solve_dynamic_equation)(de, coord, ics, declared_assumptions) for _, _, de, coord, ics in tasks
+        )
+        for (label, ind, *_), solution in zip(tasks, tasks_solutions, strict=True):
+            solutions[label][ind] = solution
         return self
 
     def simulate(self: Self, method: str = 'dynamic_equations', I: dict[str, Any] | None = None) -> Self:
@@ -189,6 +310,6 @@ class ClassicalMechanicsSystem(BaseSystem):
         # Dynamic equations
         if method == 'dynamic_equations':
             self.simulation_results_['dynamic_equations'] = {'formulas': {}, 'solutions': {}}
-            self._set_dynamic_equations()._solve_dynamic_equations()
+            self._set_coordinates_names()._set_dynamic_equations()._solve_dynamic_equations()
 
         return self
@@ -1,9 +1,11 @@
 """Test the classical mechanics module."""
 
 import re
+from contextlib import contextmanager
+from functools import cache
 
 import pytest
-from sage.all import assume, symbolic_expression, var
+from sage.all import assume, assumptions, cos, diff, forget, sin, sqrt, symbolic_expression, var
 from skcomplex.physics import (
     ClassicalMechanicsSystem,
     ExternalForce,
@@ -12,10 +14,44 @@ from skcomplex.physics import (
     InternalPotential,
     PointParticle,
 )
+from skcomplex.physics._classical_mechanics import (
+    coordinate_function,
+    has_inexact_numbers,
+    solve_dynamic_equation,
+)
 from skcomplex.spaces import EuclideanSpace
 
+EUCLIDEAN_3D = EuclideanSpace('euclidean', n_dim=3)
+FORCE_ERROR_MSG = re.compile(
+    r'Parameter `F` should be a list of numeric elements or symbolic expressions\. Got `.+` instead\.',
+)
+POTENTIAL_ERROR_MSG = re.compile(
+    r'Parameter `V` should be a numeric element or symbolic expression\. Got `.+` instead\.',
+)
+
+
+@cache
+def _sx(expression):
+    """Parse a symbolic expression once."""
+    return symbolic_expression(expression)
+
+
+@cache
+def _v(names):
+    """Create symbolic variables once."""
+    return var(names)
+
+
+K1, K2, t = _v('_K1 _K2 t')
+FREE_MOTION = K2 * t + K1
+
+
+def _oscillation(k, m):
+    """Expected solution of a harmonic oscillator without initial conditions."""
+    return K2 * cos(sqrt(k) * t / sqrt(m)) + K1 * sin(sqrt(k) * t / sqrt(m))
 
-@pytest.mark.parametrize('m', ['m', var('m__point')])
+
+@pytest.mark.parametrize('m', ['m', _v('m__point')])
 def test_point_particle_wrong_mass_type(m):
     """Test raising an error for wrong mass type."""
     with pytest.raises(TypeError, match='m must be an instance of {int, float}'):
@@ -34,7 +70,7 @@ def test_point_particle_default_mass(label):
     """Test point particle class for default mass."""
     point_particle = PointParticle(label)
     assert point_particle.m is None
-    assert bool(var(f'm__{label}') == point_particle.m_)
+    assert bool(_v(f'm__{label}') == point_particle.m_)
 
 
 @pytest.mark.parametrize('m', [2.0, 4])
@@ -46,171 +82,359 @@ def test_point_particle_numeric_mass(m):
     assert point_particle.m_ == m
 
 
-@pytest.mark.parametrize('F', [4.5, symbolic_expression(6.0)])
-def test_internal_force_wrong_force_type(F):
+FORCES = pytest.mark.parametrize(
+    ('force_cls', 'elements_labels'),
+    [(InternalForce, ('1', '2')), (ExternalForce, ('1',))],
+    ids=['internal', 'external'],
+)
+POTENTIALS = pytest.mark.parametrize(
+    ('potential_cls', 'elements_labels'),
+    [(InternalPotential, ('1', '2')), (ExternalPotential, ('1',))],
+    ids=['internal', 'external'],
+)
+
+
+@FORCES
+@pytest.mark.parametrize('F', [4.5, _sx(6.0)])
+def test_force_wrong_force_type(force_cls, elements_labels, F):
     """Test raising an error for wrong force type."""
-    error_msg = f'Parameter `F` should be a list of numeric elements or symbolic expressions. Got `{F}` instead.'
-    with pytest.raises(TypeError, match=error_msg):
-        InternalForce('gravity', '1', '2', F)
+    with pytest.raises(TypeError, match=FORCE_ERROR_MSG):
+        force_cls('gravity', *elements_labels, F)
 
 
+@FORCES
 @pytest.mark.parametrize('F', [[5.6, 'F', 3.4], 'F'])
-def test_internal_force_wrong_force_value(F):
+def test_force_wrong_force_value(force_cls, elements_labels, F):
     """Test raising an error for wrong force value."""
-    error_msg = f'Parameter `F` should be a list of numeric elements or symbolic expressions. Got `{F}` instead.'
-    with pytest.raises(AssertionError, match=re.escape(error_msg)):
-        InternalForce('gravity', '1', '2', F)
+    with pytest.raises(AssertionError, match=FORCE_ERROR_MSG):
+        force_cls('gravity', *elements_labels, F)
 
 
+@FORCES
 @pytest.mark.parametrize('label', ['gravity', 'contact'])
-def test_internal_force_default_force(label):
-    """Test internal force class for default force."""
-    internal_force = InternalForce(label, '1', '2')
-    assert internal_force.F is None
-    assert bool(var(f'F__{label}__1__2') == internal_force.F_)
+def test_force_default_force(force_cls, elements_labels, label):
+    """Test force classes for default force."""
+    force = force_cls(label, *elements_labels)
+    assert force.F is None
+    assert bool(_v(f'F__{label}__{"__".join(elements_labels)}') == force.F_)
 
 
+@FORCES
 @pytest.mark.parametrize(
     'F',
     [
         [1.5, 2, 3.0],
         [0, 4, 2],
-        [symbolic_expression('2 * x'), symbolic_expression('x + y^2')],
-        [var('x') + var('y'), 5.0],
+        [_sx('2 * x'), _sx('x + y^2')],
+        [_v('x') + _v('y'), 5.0],
     ],
 )
-def test_internal_force(F):
-    """Test internal force class."""
-    internal_force = InternalForce('internal', '1', '2', F)
-    assert internal_force.F is F
-    assert F == internal_force.F_
+def test_force(force_cls, elements_labels, F):
+    """Test force classes."""
+    force = force_cls('force', *elements_labels, F)
+    assert force.F is F
+    assert F == force.F_
 
 
+@POTENTIALS
 @pytest.mark.parametrize('V', [[4.5], 'V'])
-def test_internal_potential_wrong_potential_type(V):
+def test_potential_wrong_potential_type(potential_cls, elements_labels, V):
     """Test raising an error for wrong potential type."""
-    error_msg = f'Parameter `V` should be a numeric element or symbolic expression. Got `{V}` instead.'
-    with pytest.raises(TypeError, match=re.escape(error_msg)):
-        InternalPotential('gravity', '1', '2', V)
+    with pytest.raises(TypeError, match=POTENTIAL_ERROR_MSG):
+        potential_cls('gravity', *elements_labels, V)
 
 
+@POTENTIALS
 @pytest.mark.parametrize('label', ['gravity', 'contact'])
-def test_internal_potential_default_potential(label):
-    """Test internal potential class for default potential."""
-    internal_potential = InternalPotential(label, '1', '2')
-    assert internal_potential.V is None
-    assert bool(var(f'V__{label}__1__2') == internal_potential.V_)
-
-
-@pytest.mark.parametrize('V', [2.0, var('x') + 5.0, symbolic_expression('x + y^2')])
-def test_internal_potential(V):
-    """Test internal potential class for default potential."""
-    internal_potential = InternalPotential('internal', '1', '2', V)
-    assert internal_potential.V is V
-    assert symbolic_expression(V) == internal_potential.V_
-
-
-@pytest.mark.parametrize('F', [1.5, symbolic_expression(2.0)])
-def test_external_force_wrong_force_type(F):
-    """Test raising an error for wrong force type."""
-    error_msg = f'Parameter `F` should be a list of numeric elements or symbolic expressions. Got `{F}` instead.'
-    with pytest.raises(TypeError, match=error_msg):
-        ExternalForce('gravity', '1', F)
+def test_potential_default_potential(potential_cls, elements_labels, label):
+    """Test potential classes for default potential."""
+    potential = potential_cls(label, *elements_labels)
+    assert potential.V is None
+    assert bool(_v(f'V__{label}__{"__".join(elements_labels)}') == potential.V_)
+
+
+@POTENTIALS
+@pytest.mark.parametrize('V', [2.0, _v('x') + 5.0, _sx('x + y^2')])
+def test_potential(potential_cls, elements_labels, V):
+    """Test potential classes."""
+    potential = potential_cls('potential', *elements_labels, V)
+    assert potential.V is V
+    assert symbolic_expression(V) == potential.V_
+
+
+@contextmanager
+def _assuming(*relations):
+    """Declare Sage assumptions only inside the context."""
+    assume(*relations)
+    try:
+        yield
+    finally:
+        forget(*relations)
+
+
+@pytest.fixture()
+def positive_k():
+    """Symbolic stiffness assumed to be positive during the test."""
+    k = _v('k')
+    with _assuming(k > 0):
+        yield k
+
+
+@pytest.fixture(autouse=True)
+def _forget_assumptions():
+    """Forget the Sage assumptions declared during a test."""
+    previous_assumptions = {str(assumption) for assumption in assumptions()}
+    yield
+    new_assumptions = [assumption for assumption in assumptions() if str(assumption) not in previous_assumptions]
+    if new_assumptions:
+        forget(*new_assumptions)
+
+
+@pytest.fixture(scope='session')
+def free_particle_solutions():
+    """Solutions of the dynamic equations of a free particle."""
+    system = ClassicalMechanicsSystem(particles=[PointParticle('1')], space=EUCLIDEAN_3D)
+    system.simulate()
+    return system.simulation_results_['dynamic_equations']['solutions']
 
 
-@pytest.mark.parametrize('F', [[1.6, 'Force', 3.4], 'Force'])
-def test_external_force_wrong_force_value(F):
-    """Test raising an error for wrong force value."""
-    error_msg = f'Parameter `F` should be a list of numeric elements or symbolic expressions. Got `{F}` instead.'
-    with pytest.raises(AssertionError, match=re.escape(error_msg)):
-        ExternalForce('gravity', '1', F)
+@pytest.fixture(scope='session')
+def constant_force_solutions():
+    """Solutions of the dynamic equations of a particle under constant external force."""
+    system = ClassicalMechanicsSystem(
+        particles=[PointParticle('particle')],
+        external_interactions=[ExternalForce('constant', 'particle', [_v('F'), 0, 0])],
+        space=EUCLIDEAN_3D,
+    )
+    system.simulate()
+    return system.simulation_results_['dynamic_equations']['solutions']
 
 
-@pytest.mark.parametrize('label', ['gravity', 'contact'])
-def test_external_force_default_force(label):
-    """Test external force class for default force."""
-    external_force = ExternalForce(label, '1')
-    assert external_force.F is None
-    assert bool(var(f'F__{label}__1') == external_force.F_)
+@pytest.fixture(scope='session')
+def harmonic_oscillator_solutions():
+    """Solutions of the dynamic equations of a one dimensional harmonic oscillator."""
+    k, x__sphere = _v('k x__sphere')
+    system = ClassicalMechanicsSystem(
+        particles=[PointParticle('sphere')],
+        external_interactions=[ExternalForce('elastic', 'sphere', [-k * x__sphere, 0, 0])],
+        space=EUCLIDEAN_3D,
+    )
+    with _assuming(k > 0):
+        system.simulate()
+    return system.simulation_results_['dynamic_equations']['solutions']
 
 
 @pytest.mark.parametrize(
-    'F',
+    ('solutions_fixture', 'expected_solutions'),
     [
-        [1.5, 2, 3.0],
-        [0, 4, 2],
-        [symbolic_expression('2 * x^3'), symbolic_expression('x^2 + y^2')],
-        [var('x') + var('y'), 2.0],
+        ('free_particle_solutions', {'1': [FREE_MOTION, FREE_MOTION, FREE_MOTION]}),
+        (
+            'constant_force_solutions',
+            {'particle': [FREE_MOTION + _v('F') * t**2 / (2 * _v('m__particle')), FREE_MOTION, FREE_MOTION]},
+        ),
+        (
+            'harmonic_oscillator_solutions',
+            {'sphere': [_oscillation(_v('k'), _v('m__sphere')), FREE_MOTION, FREE_MOTION]},
+        ),
     ],
+    ids=['constant_velocity', 'constant_acceleration', 'one_dimensional_harmonic_oscillator'],
 )
-def test_external_force(F):
-    """Test external force class."""
-    external_force = ExternalForce('internal', '1', F)
-    assert external_force.F is F
-    assert F == external_force.F_
+def test_motion(request, solutions_fixture, expected_solutions):
+    """Test the solution of dynamic equations of free, accelerated and oscillating particles."""
+    solutions = request.getfixturevalue(solutions_fixture)
+    assert solutions.keys() == expected_solutions.keys()
+    for label, expected_label_solutions in expected_solutions.items():
+        for solution, expected_solution in zip(solutions[label], expected_label_solutions, strict=True):
+            assert solution == expected_solution
 
 
-@pytest.mark.parametrize('V', [[4.5], 'V'])
-def test_external_potential_wrong_potential_type(V):
-    """Test raising an error for wrong potential type."""
-    error_msg = f'Parameter `V` should be a numeric element or symbolic expression. Got `{V}` instead.'
-    with pytest.raises(TypeError, match=re.escape(error_msg)):
-        ExternalPotential('gravity', '1', V)
+def test_motion_with_constant_force_skips_desolve(monkeypatch):
+    """Test that constant force equations are solved without calling `desolve`."""
 
+    def desolve(*args, **kwargs):
+        error_msg = '`desolve` should not be called for constant forces.'
+        raise AssertionError(error_msg)
 
-@pytest.mark.parametrize('label', ['gravity', 'contact'])
-def test_external_potential_default_potential(label):
-    """Test external potential class for default potential."""
-    external_potential = ExternalPotential(label, '1')
-    assert external_potential.V is None
-    assert bool(var(f'V__{label}__1') == external_potential.V_)
+    monkeypatch.setattr('skcomplex.physics._classical_mechanics.desolve', desolve)
+    system = ClassicalMechanicsSystem(
+        particles=[PointParticle('particle')],
+        external_interactions=[ExternalForce('constant', 'particle', [_v('F'), 0, 0])],
+        space=EUCLIDEAN_3D,
+    )
+    system.simulate()
+    solutions = system.simulation_results_['dynamic_equations']['solutions']
+    assert solutions['particle'][0] == FREE_MOTION + _v('F') * t**2 / (2 * _v('m__particle'))
+    assert solutions['particle'][1] == FREE_MOTION
+    assert solutions['particle'][2] == FREE_MOTION
 
 
-@pytest.mark.parametrize('V', [3.0, var('x') + 1.0, symbolic_expression('x^2 + y^2')])
-def test_external_potential(V):
-    """Test external potential class for default potential."""
-    external_potential = ExternalPotential('internal', '1', V)
-    assert external_potential.V is V
-    assert symbolic_expression(V) == external_potential.V_
+def test_motion_with_numeric_mass():
+    """Test the solution of dynamic equations of a free particle with numeric mass."""
+    system = ClassicalMechanicsSystem(particles=[PointParticle('p', 2.0)], space=EUCLIDEAN_3D)
+    system.simulate()
+    solutions = system.simulation_results_['dynamic_equations']['solutions']
+    assert list(solutions) == ['p']
+    for solution in solutions['p']:
+        assert solution == FREE_MOTION
 
 
-def test_motion_with_constant_velocity():
-    """Test the solution of dynamic equations of a free particle."""
-    system = ClassicalMechanicsSystem(particles=[PointParticle('1')], space=EuclideanSpace('euclidean', n_dim=3))
+def test_motion_with_numeric_constant_force():
+    """Test the rational coefficients of the solution under a numeric constant force."""
+    system = ClassicalMechanicsSystem(
+        particles=[PointParticle('particle')],
+        external_interactions=[ExternalForce('constant', 'particle', [3.0, 0, 0])],
+        space=EUCLIDEAN_3D,
+    )
     system.simulate()
     solutions = system.simulation_results_['dynamic_equations']['solutions']
-    assert solutions['1'][0] == symbolic_expression('_K2 * t + _K1')
-    assert solutions['1'][1] == symbolic_expression('_K2 * t + _K1')
-    assert solutions['1'][2] == symbolic_expression('_K2 * t + _K1')
+    assert solutions['particle'][0] == FREE_MOTION + 3 * t**2 / (2 * _v('m__particle'))
+    assert not has_inexact_numbers(solutions['particle'][0])
+    assert solutions['particle'][1] == FREE_MOTION
+    assert solutions['particle'][2] == FREE_MOTION
+
+
+def test_interactions_index():
+    """Test the grouping of interactions by the element they act on."""
+    internal_force = InternalForce('spring', '1', '2', [1.0, 0, 0])
+    external_force_1 = ExternalForce('constant', '1', [0, 1.0, 0])
+    external_force_2 = ExternalForce('constant', '2', [0, 0, 1.0])
+    system = ClassicalMechanicsSystem(
+        particles=[PointParticle('1'), PointParticle('2'), PointParticle('3')],
+        internal_interactions=[internal_force],
+        external_interactions=[external_force_1, external_force_2],
+        space=EUCLIDEAN_3D,
+    )
+    system.simulate()
+    assert system.interactions_index_ == {
+        '1': [internal_force, external_force_1],
+        '2': [external_force_2],
+        '3': [],
+    }
 
 
-def test_motion_with_constant_acceleration():
-    """Test the solution of dynamic equations under constant external force."""
+def test_internal_interactions_duplicated_labels():
+    """Test raising an error for internal interactions with duplicated labels."""
+    system = ClassicalMechanicsSystem(
+        particles=[PointParticle('1'), PointParticle('2')],
+        internal_interactions=[InternalForce('spring', '1', '2', [1.0, 0, 0]), InternalForce('spring', '1', '2')],
+        space=EUCLIDEAN_3D,
+    )
+    with pytest.raises(AssertionError, match='Interactions between elements should have unique labels'):
+        system.simulate()
+
+
+def test_external_interactions_duplicated_labels():
+    """Test raising an error for external interactions with duplicated labels."""
+    system = ClassicalMechanicsSystem(
+        particles=[PointParticle('1'), PointParticle('2')],
+        external_interactions=[ExternalForce('constant', '1', [1.0, 0, 0]), ExternalForce('constant', '1')],
+        space=EUCLIDEAN_3D,
+    )
+    with pytest.raises(AssertionError, match='Interactions of elements with environment should have unique labels'):
+        system.simulate()
+
+
+def test_motion_with_numeric_forces():
+    """Test the solution of dynamic equations under multiple numeric external forces."""
     system = ClassicalMechanicsSystem(
         particles=[PointParticle('particle')],
-        external_interactions=[ExternalForce('constant', 'particle', [var('F'), 0, 0])],
-        space=EuclideanSpace('euclidean', n_dim=3),
+        external_interactions=[
+            ExternalForce('constant1', 'particle', [1.0, 0, 0]),
+            ExternalForce('constant2', 'particle', [2, 0, 0]),
+        ],
+        space=EUCLIDEAN_3D,
     )
     system.simulate()
     solutions = system.simulation_results_['dynamic_equations']['solutions']
-    assert solutions['particle'][0] == symbolic_expression('_K2 * t + 1 / 2 * F * t**2 / m__particle + _K1')
-    assert solutions['particle'][1] == symbolic_expression('_K2 * t + _K1')
-    assert solutions['particle'][2] == symbolic_expression('_K2 * t + _K1')
+    assert solutions['particle'][0] == FREE_MOTION + 3 * t**2 / (2 * _v('m__particle'))
+    assert solutions['particle'][1] == FREE_MOTION
+    assert solutions['particle'][2] == FREE_MOTION
 
 
-def test_motion_one_dimensional_harmonic_oscillator():
-    """Test the solution of dynamic equations of harmonic oscillator."""
-    k, x__sphere = var('k x__sphere')
-    assume(k > 0)
+@pytest.mark.parametrize(
+    'forces',
+    [[[1.0, 0, 0], [2.0, 0]], [[_v('F'), 0]], [[1.0, 0, 0], [_v('F'), 0, 0, 0]]],
+    ids=['numeric', 'symbolic', 'mixed'],
+)
+def test_motion_wrong_force_dimension(forces):
+    """Test raising an error for forces with wrong number of components."""
     system = ClassicalMechanicsSystem(
-        particles=[PointParticle('sphere')],
-        external_interactions=[ExternalForce('elastic', 'sphere', [-k * x__sphere, 0, 0])],
-        space=EuclideanSpace('euclidean', n_dim=3),
+        particles=[PointParticle('particle')],
+        external_interactions=[ExternalForce(f'force{ind}', 'particle', F) for ind, F in enumerate(forces, start=1)],
+        space=EUCLIDEAN_3D,
     )
+    with pytest.raises(ValueError, match='acting on element `particle` should have 3 components'):
+        system.simulate()
+
+
+def _two_dimensional_harmonic_oscillators(k, n_jobs=None):
+    """System of two harmonic oscillators along different axes."""
+    x__1, y__2 = _v('x__1 y__2')
+    return ClassicalMechanicsSystem(
+        particles=[PointParticle('1'), PointParticle('2')],
+        external_interactions=[
+            ExternalForce('elastic1', '1', [-k * x__1, 0]),
+            ExternalForce('elastic2', '2', [0, -k * y__2]),
+        ],
+        space=EuclideanSpace('euclidean', n_dim=2),
+        n_jobs=n_jobs,
+    )
+
+
+def test_motion_two_dimensional_harmonic_oscillators(positive_k):
+    """Test the solution of dynamic equations of harmonic oscillators along different axes."""
+    system = _two_dimensional_harmonic_oscillators(positive_k)
     system.simulate()
     solutions = system.simulation_results_['dynamic_equations']['solutions']
-    assert solutions['sphere'][0] == symbolic_expression(
-        '_K2 * cos(sqrt(k) * t / sqrt(m__sphere)) + _K1 * sin(sqrt(k) * t / sqrt(m__sphere))',
-    )
-    assert solutions['sphere'][1] == symbolic_expression('_K2 * t + _K1')
-    assert solutions['sphere'][2] == symbolic_expression('_K2 * t + _K1')
+    assert solutions['1'][0] == _oscillation(positive_k, _v('m__1'))
+    assert solutions['1'][1] == FREE_MOTION
+    assert solutions['2'][0] == FREE_MOTION
+    assert solutions['2'][1] == _oscillation(positive_k, _v('m__2'))
+
+
+def test_solve_dynamic_equation_declared_assumptions():
+    """Test that the declared assumptions are registered only while solving, as in a worker process."""
+    k = _v('k')
+    forget(k > 0)
+    x__1 = coordinate_function('x__1')
+    solution = solve_dynamic_equation(diff(x__1, t, 2) == -k * x__1, 'x__1', None, [k > 0])
+    assert solution == _oscillation(k, 1)
+    assert str(k > 0) not in {str(assumption) for assumption in assumptions()}
+
+
+def test_motion_n_jobs(monkeypatch, positive_k):
+    """Test the dispatch of the dynamic equations solved by `desolve` to parallel jobs.
+
+    The jobs run serially, since every worker process would have to import Sage.
+    """
+    parallel_calls = []
+
+    def parallel(n_jobs):
+        def run(tasks):
+            tasks = list(tasks)
+            parallel_calls.append((n_jobs, len(tasks)))
+            return [func(*args) for func, args in tasks]
+
+        return run
+
+    monkeypatch.setattr('skcomplex.physics._classical_mechanics.Parallel', parallel)
+    monkeypatch.setattr('skcomplex.physics._classical_mechanics.delayed', lambda func: lambda *args: (func, args))
+    system = _two_dimensional_harmonic_oscillators(positive_k, n_jobs=2)
+    system.simulate()
+    solutions = system.simulation_results_['dynamic_equations']['solutions']
+    assert parallel_calls == [(2, 2)]
+    assert solutions['1'][0] == _oscillation(positive_k, _v('m__1'))
+    assert solutions['2'][1] == _oscillation(positive_k, _v('m__2'))
+
+
+def test_simulate_validation_after_modifying_parameters():
+    """Test that the system is validated again when one of its parameters is modified in place."""
+    system = ClassicalMechanicsSystem(particles=[PointParticle('1')], space=EUCLIDEAN_3D)
+    system.simulate()
+    assert list(system.simulation_results_['dynamic_equations']['solutions']) == ['1']
+    system.elements.append(PointParticle('2'))
+    system.simulate()
+    assert list(system.simulation_results_['dynamic_equations']['solutions']) == ['1', '2']
+    system.elements.append(PointParticle('1'))
+    with pytest.raises(AssertionError, match='Elements should have unique labels.'):
+        system.simulate()